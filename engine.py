@@ -1,8 +1,38 @@
 #Engine wrapper for Stockfish integration.
+import os
+import sqlite3
+import struct
 import chess
 import chess.engine
-from dataclasses import dataclass
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+# Max positions kept in the in-memory analysis cache (LRU eviction past this)
+CACHE_CAPACITY = 100_000
+# Stockfish transposition table size (MB); larger = more reuse across positions
+ENGINE_HASH_MB = 2048
+# Leave one core free for the GUI / OS
+ENGINE_THREADS = max(1, (os.cpu_count() or 2) - 1)
+# Dirty cache entries are written to disk in batches of this size
+CACHE_FLUSH_BATCH = 256
+
+# 8 bitboards + turn + castling rights + ep square (64 = none)
+_KEY_STRUCT = struct.Struct("<8Q?QB")
+
+
+# Hashable position identity for caches: pieces + turn + castling + ep,
+# no move counters. _transposition_key() is a tuple of ints (no string
+# building like fen()), but it is python-chess internal, so fall back to
+# the equivalent FEN fields if it ever disappears.
+if hasattr(chess.Board, "_transposition_key"):
+    def position_key(board: chess.Board) -> tuple:
+        return board._transposition_key()
+else:
+    def position_key(board: chess.Board) -> tuple:
+        return (board.board_fen(), board.turn, board.clean_castling_rights(),
+                board.ep_square if board.has_legal_en_passant() else None)
 
 # 100 centipawns = 1 pawn unit
 @dataclass(frozen=True)
@@ -11,43 +41,426 @@ class AnalysisResult:
     best_move: Optional[chess.Move]      # Engine's recommended move (None if no PV)
     is_mate: bool                        # True if forced mate exists
     mate_in: Optional[int]               # Moves to mate (+ = White mates, - = Black mates)
+    depth: int = 0                       # Search depth this result was produced at
+    nodes: int = 0                       # Nodes searched (0 if unknown)
+    top_moves: Tuple[Tuple[chess.Move, int], ...] = ()  # (move, cp White POV) per PV line, best first
+    multipv: int = 1                     # PV lines requested (top_moves may hold fewer)
+
+
+# Result of analyze_with_move(): one position and the move played from it
+@dataclass(frozen=True)
+class MoveAnalysis:
+    cp_score_white_before: int           # Eval before the move (White POV)
+    cp_score_white_after: int            # Eval after the move (White POV)
+    best_move: Optional[chess.Move]      # Engine's recommended move in the 'before' position
+    top_moves: Tuple[Tuple[chess.Move, int], ...] = ()  # 'before' position's top lines (see AnalysisResult)
 
 
 class ChessEngine:
     # Wused class and not func bcz : Engine process lifecycle management.
     # Starting/stopping Stockfish is expensive; we want to do it once.
     
-    def __init__(self, stockfish_path: str, depth: int = 15):
+    def __init__(
+        self,
+        stockfish_path: str,
+        depth: int = 15,
+        nodes: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        cache_size: int = CACHE_CAPACITY,
+        threads: int = ENGINE_THREADS,
+        hash_mb: int = ENGINE_HASH_MB,
+        multipv: int = 1
+    ):
         # more depth is better but slower so 15 is balanced
+        # nodes: search a fixed node budget instead of a fixed depth. Tactical
+        # positions cost far more per ply, so this bounds the worst-case latency.
+        # cache_path: optional SQLite file so analyses survive between runs
+        # cache_size: positions kept in memory (LRU); the SQLite file holds the rest
+        # threads/hash_mb: Stockfish defaults (1 thread, 16 MB) waste most machines
+        # multipv: lines per analysis; >1 fills top_moves from the same single search
         self.stockfish_path = stockfish_path
         self.depth = depth
+        self.nodes = nodes
+        self.cache_path = cache_path
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.multipv = multipv
         self._engine: Optional[chess.engine.SimpleEngine] = None
+        # Position -> deepest result seen. Keyed on the transposition key
+        # (pieces + turn + castling + ep), so move order doesn't matter.
+        self._cache: "OrderedDict[tuple, AnalysisResult]" = OrderedDict()
+        self._cache_cap = cache_size
+        # Persistent store: read lazily on memory misses, written in batches
+        self._db: Optional[sqlite3.Connection] = None
+        self._dirty: Dict[bytes, AnalysisResult] = {}
+        # Open-ended background search ('go infinite'), see start_analysis()
+        self._current_analysis: Optional[chess.engine.SimpleAnalysisResult] = None
+        self._current_board: Optional[chess.Board] = None
     
     def start(self) -> None:
         # Initialize engine process. Called automatically by __enter__.
         if self._engine is None:
             self._engine = chess.engine.SimpleEngine.popen_uci(self.stockfish_path)
+            self._configure()
+        if self.cache_path and self._db is None:
+            self._open_store()
+    
+    def _configure(self) -> None:
+        # Set once per process. 'ucinewgame' is never sent between searches
+        # (python-chess only sends it on the first one), so the hash table
+        # stays warm for the whole session.
+        options = {"Threads": self.threads, "Hash": self.hash_mb, "Move Overhead": 10}
+        for name, value in options.items():
+            try:
+                self._engine.configure({name: value})
+            except chess.engine.EngineError:
+                pass  # Custom/older builds may not expose every option
     
     def stop(self) -> None:
         if self._engine is not None:
+            self.stop_analysis()
             self._engine.quit()
             self._engine = None
+        if self._db is not None:
+            self._flush_store()
+            self._db.close()
+            self._db = None
+    
+    def clear_cache(self) -> None:
+        self._cache.clear()
+    
+    def _cache_get(
+        self,
+        board: chess.Board,
+        depth: Optional[int] = None,
+        multipv: Optional[int] = None
+    ) -> Optional[AnalysisResult]:
+        # A deeper result answers a shallower request; never the other way round
+        key = position_key(board)
+        result = self._cache.get(key)
+        if result is None and self._db is not None:
+            result = self._load_from_store(board)
+            if result is not None:
+                self._cache[key] = result
+        if result is None or not self._is_good_enough(result, depth or self.depth, multipv or self.multipv):
+            return None
+        self._cache.move_to_end(key)
+        return result
+    
+    def _is_good_enough(self, result: AnalysisResult, depth: int, multipv: int) -> bool:
+        # Reaching the target depth always counts; in node mode, so does a
+        # search that already spent at least the node budget.
+        # Either way it must carry as many PV lines as we ask for.
+        if result.multipv < multipv:
+            return False
+        if result.depth >= depth:
+            return True
+        return self.nodes is not None and result.nodes >= self.nodes
+    
+    def _cache_put(self, board: chess.Board, result: AnalysisResult) -> None:
+        key = position_key(board)
+        cached = self._cache.get(key)
+        # The deeper analysis wins; extra lines only break a tie in depth.
+        # A shallower result never replaces a deeper one (lost depth can't be
+        # recovered by _is_good_enough, extra lines can be searched again).
+        if cached is not None and (
+            cached.depth > result.depth
+            or (cached.depth == result.depth and cached.multipv > result.multipv)
+        ):
+            return
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_cap:
+            self._cache.popitem(last=False)
+        if self._db is not None:
+            self._dirty[self._pack_key(board)] = result
+            if len(self._dirty) >= CACHE_FLUSH_BATCH:
+                self._flush_store()
+    
+    # ----- persistent cache (SQLite) -----
+    
+    @staticmethod
+    def _pack_key(board: chess.Board) -> bytes:
+        # Compact fixed-size blob of the same fields as position_key()
+        ep = board.ep_square if board.has_legal_en_passant() else None
+        return _KEY_STRUCT.pack(
+            board.pawns, board.knights, board.bishops, board.rooks,
+            board.queens, board.kings,
+            board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK],
+            board.turn, board.clean_castling_rights(), 64 if ep is None else ep
+        )
+    
+    def _open_store(self) -> None:
+        # check_same_thread=False: callers may start/stop from different threads,
+        # but all access goes through this object so it is never concurrent
+        self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            "key BLOB PRIMARY KEY, cp INT, best_move TEXT, "
+            "is_mate INT, mate_in INT, depth INT, multipv INT DEFAULT 1, top_moves TEXT, "
+            "nodes INT DEFAULT 0)"
+        )
+        # Files written by older versions lack the later columns
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(analysis)")}
+        if "multipv" not in columns:
+            self._db.execute("ALTER TABLE analysis ADD COLUMN multipv INT DEFAULT 1")
+        if "top_moves" not in columns:
+            self._db.execute("ALTER TABLE analysis ADD COLUMN top_moves TEXT")
+        # Node mode (ENGINE_NODES) judges cached entries by the nodes searched
+        if "nodes" not in columns:
+            self._db.execute("ALTER TABLE analysis ADD COLUMN nodes INT DEFAULT 0")
+        self._db.commit()
+    
+    def _load_from_store(self, board: chess.Board) -> Optional[AnalysisResult]:
+        row = self._db.execute(
+            "SELECT cp, best_move, is_mate, mate_in, depth, multipv, top_moves, nodes "
+            "FROM analysis WHERE key = ?",
+            (self._pack_key(board),)
+        ).fetchone()
+        if row is None:
+            return None
+        cp, best_move, is_mate, mate_in, depth, multipv, top_moves, nodes = row
+        return AnalysisResult(
+            cp_score_white=cp,
+            best_move=chess.Move.from_uci(best_move) if best_move else None,
+            is_mate=bool(is_mate),
+            mate_in=mate_in,
+            depth=depth,
+            nodes=nodes or 0,
+            top_moves=self._decode_top_moves(top_moves),
+            multipv=multipv or 1
+        )
+    
+    @staticmethod
+    def _encode_top_moves(top_moves: Tuple[Tuple[chess.Move, int], ...]) -> Optional[str]:
+        # "e2e4:35 d2d4:20" - compact and readable in the SQLite shell
+        if not top_moves:
+            return None
+        return " ".join(f"{move.uci()}:{cp}" for move, cp in top_moves)
     
-    def analyze(self, board: chess.Board) -> AnalysisResult:        
+    @staticmethod
+    def _decode_top_moves(text: Optional[str]) -> Tuple[Tuple[chess.Move, int], ...]:
+        if not text:
+            return ()
+        lines = []
+        for item in text.split():
+            uci, cp = item.split(":")
+            lines.append((chess.Move.from_uci(uci), int(cp)))
+        return tuple(lines)
+    
+    def _flush_store(self) -> None:
+        if not self._dirty:
+            return
+        rows = [
+            (key, r.cp_score_white, r.best_move.uci() if r.best_move else None,
+             int(r.is_mate), r.mate_in, r.depth, r.multipv, self._encode_top_moves(r.top_moves),
+             r.nodes)
+            for key, r in self._dirty.items()
+        ]
+        # Only overwrite a stored row with a deeper analysis, or an equally
+        # deep one with at least as many PV lines (same rule as _cache_put)
+        self._db.executemany(
+            "INSERT INTO analysis (key, cp, best_move, is_mate, mate_in, depth, multipv, top_moves, nodes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET cp = excluded.cp, best_move = excluded.best_move, "
+            "is_mate = excluded.is_mate, mate_in = excluded.mate_in, depth = excluded.depth, "
+            "multipv = excluded.multipv, top_moves = excluded.top_moves, nodes = excluded.nodes "
+            "WHERE excluded.depth > analysis.depth "
+            "OR (excluded.depth = analysis.depth AND excluded.multipv >= analysis.multipv)",
+            rows
+        )
+        self._db.commit()
+        self._dirty.clear()
+    
+    def analyze(
+        self,
+        board: chess.Board,
+        depth: Optional[int] = None,
+        multipv: Optional[int] = None
+    ) -> AnalysisResult:
         # using white perspective for consistency for now
+        # depth: per-call override of self.depth (ignored in node mode)
+        # multipv: PV lines a cached result must carry (default self.multipv);
+        #   1 when only score and best move are used, so single-line entries
+        #   such as get_move()'s seed count. A search still uses self.multipv.
         if self._engine is None:
             raise RuntimeError("Engine not started. Use 'with' statement or call start().")
         
-        # Analyze to fixed depth (consistent analysis quality)
-        info = self._engine.analyse(board, chess.engine.Limit(depth=self.depth))
+        # A background search keeps its work: its snapshot lands in the cache
+        self.stop_analysis()
         
-        # .white() gives score from White's perspective regardless of whose turn
-        score = info["score"].white()
+        # Revisited positions (undo, repeated lines) skip the search entirely
+        cached = self._cache_get(board, depth, multipv)
+        if cached is not None:
+            return cached
+        
+        result = self._search(board, depth or self.depth)
+        self._cache_put(board, result)
+        return result
+    
+    def analyze_with_move(
+        self,
+        board: chess.Board,
+        move: chess.Move,
+        before_depth: Optional[int] = None,
+        before_multipv: Optional[int] = None
+    ) -> MoveAnalysis:
+        # Evaluate a position and the move played from it.
+        # The 'after' score comes from 'go searchmoves <move>' on the same root
+        # position, so it runs on the hash table the 'before' search just filled
+        # instead of starting a second independent search from the child.
+        # before_depth: the 'before' search only has to rank candidate moves,
+        # so it may run shallower; the graded 'after' score always uses self.depth.
+        # before_multipv: see analyze(); 1 when top_moves are not needed.
+        before = self.analyze(board, before_depth, before_multipv)
+        
+        board_after = board.copy(stack=False)
+        board_after.push(move)
+        # Only the score is used, so a single-line entry (e.g. an earlier
+        # searchmoves result, stored with multipv=1) is good enough
+        after = self._cache_get(board_after, multipv=1)
+        if after is not None:
+            cp_after = after.cp_score_white
+        elif move == before.best_move:
+            # The best move's score is the root score just found
+            cp_after = before.cp_score_white
+        else:
+            after = self._search_move(board, move, self.depth)
+            self._cache_put(board_after, after)
+            cp_after = after.cp_score_white
         
-        # Best move is first move of principal variation
-        # PV can be empty in terminal positions (checkmate/stalemate)
+        return MoveAnalysis(
+            cp_score_white_before=before.cp_score_white,
+            cp_score_white_after=cp_after,
+            best_move=before.best_move,
+            top_moves=before.top_moves
+        )
+    
+    def _search_move(self, board: chess.Board, move: chess.Move, depth: int) -> AnalysisResult:
+        # Root search restricted to `move`, returned as an analysis of the child
+        # position: one ply shallower, best reply is the second PV move
+        if self.nodes:
+            limit = chess.engine.Limit(nodes=self.nodes)
+        else:
+            limit = chess.engine.Limit(depth=depth + 1)
+        result = self._engine.play(
+            board,
+            limit,
+            info=chess.engine.INFO_BASIC | chess.engine.INFO_SCORE | chess.engine.INFO_PV,
+            root_moves=[move]
+        )
+        return self._to_child_result(board, result.info, depth + 1)
+    
+    def _to_child_result(self, board: chess.Board, info: dict, default_depth: int) -> AnalysisResult:
+        # Root search info re-read as an analysis of the position after the
+        # first PV move: one ply shallower, best reply is the second PV move
         pv = info.get("pv", [])
-        best_move = pv[0] if pv else None
+        depth = max(0, info.get("depth", default_depth) - 1)
+        child = self._to_result(info, depth, pv[1] if len(pv) > 1 else None)
+        
+        # Mate distance counts the mating side's moves; if that is the side
+        # that just moved, one of them has been played already
+        if child.is_mate and (child.mate_in > 0) == (board.turn == chess.WHITE):
+            child = replace(child, mate_in=child.mate_in - 1 if child.mate_in > 0 else child.mate_in + 1)
+        return child
+    
+    def analyze_many(self, boards: List[chess.Board]) -> List[AnalysisResult]:
+        # Whole-game review. Results come back in input order.
+        # Positions are searched back-to-back on the same process and no
+        # 'ucinewgame' is sent in between, so Stockfish's hash table from one
+        # position warms up the next (consecutive game positions share most lines).
+        if self._engine is None:
+            raise RuntimeError("Engine not started. Use 'with' statement or call start().")
+        return [self.analyze(board) for board in boards]
+    
+    def start_analysis(self, board: chess.Board) -> None:
+        # Search `board` with no limit until stopped. Replaces any running one.
+        # Stockfish keeps its hash table between positions of the same line,
+        # so a later analyze() of this position is near-instant.
+        if self._engine is None:
+            raise RuntimeError("Engine not started. Use 'with' statement or call start().")
+        self.stop_analysis()
+        self._current_board = board.copy(stack=False)
+        # Same line count as analyze(), so a long enough run is a cache hit there
+        multipv = self.multipv if self.multipv > 1 else None
+        self._current_analysis = self._engine.analysis(self._current_board, multipv=multipv)
+    
+    def poll_analysis(self) -> Optional[AnalysisResult]:
+        # Latest snapshot of the background search (None if idle / no score yet)
+        if self._current_analysis is None:
+            return None
+        info = self._current_analysis.info
+        if "score" not in info:
+            return None
+        if self.multipv > 1:
+            snapshot = self._to_multipv_result(self._current_analysis.multipv, 0)
+            # Early on, some lines have not been reported yet; don't count them
+            expected = min(self.multipv, self._current_board.legal_moves.count())
+            if len(snapshot.top_moves) < expected:
+                snapshot = replace(snapshot, multipv=len(snapshot.top_moves))
+            return snapshot
+        pv = info.get("pv", [])
+        return self._to_result(info, info.get("depth", 0), pv[0] if pv else None)
+    
+    def stop_analysis(self) -> None:
+        if self._current_analysis is None:
+            return
+        self._current_analysis.stop()
+        self._current_analysis.wait()
+        snapshot = self.poll_analysis()
+        if snapshot is not None:
+            self._cache_put(self._current_board, snapshot)
+        self._current_analysis = None
+        self._current_board = None
+    
+    def _search(self, board: chess.Board, depth: int) -> AnalysisResult:
+        # Fixed depth (consistent analysis quality) or fixed node budget
+        if self.nodes:
+            limit = chess.engine.Limit(nodes=self.nodes)
+        else:
+            limit = chess.engine.Limit(depth=depth)
+        default_depth = 0 if self.nodes else depth
+        
+        if self.multipv > 1:
+            # One 'go' for all lines: the PVs share a single search tree
+            infos = self._engine.analyse(
+                board,
+                limit,
+                multipv=self.multipv,
+                info=chess.engine.INFO_BASIC | chess.engine.INFO_SCORE | chess.engine.INFO_PV
+            )
+            return self._to_multipv_result(infos, default_depth)
+        
+        # play() + score-only info: we only need bestmove and the final score,
+        # so skip having python-chess parse and keep the full PV
+        result = self._engine.play(
+            board, limit, info=chess.engine.INFO_BASIC | chess.engine.INFO_SCORE
+        )
+        # result.move is None in terminal positions (checkmate/stalemate)
+        return self._to_result(result.info, result.info.get("depth", default_depth), result.move)
+    
+    def _to_multipv_result(self, infos: List[dict], default_depth: int) -> AnalysisResult:
+        # Line 1 gives the score; every line contributes a (move, score) entry.
+        # A running search updates its lines one at a time, so they can be at
+        # different depths: the result only claims the shallowest of them.
+        lines = [info for info in infos if info.get("pv") and "score" in info]
+        top_moves = tuple(
+            (info["pv"][0], self._to_result(info, 0, None).cp_score_white)
+            for info in lines
+        )
+        depth = min(
+            (info.get("depth", default_depth) for info in lines),
+            default=infos[0].get("depth", default_depth)
+        )
+        result = self._to_result(infos[0], depth, top_moves[0][0] if top_moves else None)
+        return replace(result, top_moves=top_moves, multipv=self.multipv)
+    
+    @staticmethod
+    def _to_result(info: dict, depth: int, best_move: Optional[chess.Move]) -> AnalysisResult:
+        # .white() gives score from White's perspective regardless of whose turn
+        score = info["score"].white()
         
         # Handle mate scores specially
         if score.is_mate():
@@ -60,17 +473,21 @@ class ChessEngine:
                 cp_score_white=score_cp,
                 best_move=best_move,
                 is_mate=True,
-                mate_in=mate_in
+                mate_in=mate_in,
+                depth=depth,
+                nodes=info.get("nodes", 0)
             )
         
         return AnalysisResult(
             cp_score_white=score.score(),
             best_move=best_move,
             is_mate=False,
-            mate_in=None
+            mate_in=None,
+            depth=depth,
+            nodes=info.get("nodes", 0)
         )
     
-    def get_move(self, board: chess.Board, time_limit: float = 1.0) -> chess.Move:
+    def get_move(self, board: chess.Board, time_limit: float = 1.0, reuse_analysis: bool = False) -> chess.Move:
         """
         separated from analyze() bcz: 
         - analyze() uses depth limit (consistent evaluation)
@@ -78,11 +495,39 @@ class ChessEngine:
         - Different parameters for different purposes
         Args:
             # time_limit: Max seconds for engine to think
+            # reuse_analysis: play the cached analysis' best move (full depth)
+            #   instead of searching again; e.g. the position right after the
+            #   player's move, which analyze_with_move() has just evaluated
         """
         if self._engine is None:
             raise RuntimeError("Engine not started. Use 'with' statement or call start().")
         
-        result = self._engine.play(board, chess.engine.Limit(time=time_limit))
+        if reuse_analysis:
+            cached = self._cache_get(board, multipv=1)  # only the best move is needed
+            if cached is not None and cached.best_move is not None:
+                return cached.best_move
+        
+        # Same process and hash table as analyze() (no 'ucinewgame' in between),
+        # so a position analyzed just before is searched from a warm table.
+        # The score comes along for free and upgrades the cached analysis.
+        self.stop_analysis()
+        result = self._engine.play(
+            board,
+            chess.engine.Limit(time=time_limit),
+            info=chess.engine.INFO_BASIC | chess.engine.INFO_SCORE | chess.engine.INFO_PV
+        )
+        if "score" in result.info:
+            self._cache_put(
+                board, self._to_result(result.info, result.info.get("depth", 0), result.move)
+            )
+            # The position after our reply is the player's next 'before'
+            # position; the same search already evaluated it, so seed it too.
+            # It is single-line: analyze(..., multipv=1) lookups use it.
+            pv = result.info.get("pv", [])
+            if result.move is not None and pv and pv[0] == result.move:
+                board_after = board.copy(stack=False)
+                board_after.push(result.move)
+                self._cache_put(board_after, self._to_child_result(board, result.info, 0))
         return result.move
 
     # Context manager protocol — enables 'with' statement
@@ -92,4 +537,67 @@ class ChessEngine:
     
     def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
         self.stop()
-        return False  # Don't suppress exceptions
\ No newline at end of file
+        return False  # Don't suppress exceptions
+
+
+class ChessEnginePool:
+    # Several independent Stockfish processes for batch review (whole games).
+    # Each position is an independent query, so N processes with a few threads
+    # each scale better than one process with many threads.
+    
+    def __init__(
+        self,
+        stockfish_path: str,
+        depth: int = 15,
+        size: Optional[int] = None,
+        threads_per_engine: int = 2,
+        hash_mb: int = ENGINE_HASH_MB
+    ):
+        # hash_mb is the pool's total budget, split evenly across its engines
+        if size is None:
+            size = max(1, (os.cpu_count() or 2) // threads_per_engine)
+        hash_per_engine = max(1, hash_mb // size)
+        self.engines = [
+            ChessEngine(stockfish_path, depth=depth, threads=threads_per_engine, hash_mb=hash_per_engine)
+            for _ in range(size)
+        ]
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def start(self) -> None:
+        for engine in self.engines:
+            engine.start()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.engines))
+    
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for engine in self.engines:
+            engine.stop()
+    
+    def analyze_many(self, boards: List[chess.Board]) -> List[AnalysisResult]:
+        # Results come back in input order.
+        # Each engine gets one contiguous slice: neighbouring positions of a game
+        # share search trees, so its hash table stays useful within the slice.
+        if self._executor is None:
+            raise RuntimeError("Pool not started. Use 'with' statement or call start().")
+        n = len(self.engines)
+        size = -(-len(boards) // n)  # ceil division
+        chunks = [boards[i:i + size] for i in range(0, len(boards), size)] if boards else []
+        futures = [
+            self._executor.submit(engine.analyze_many, chunk)
+            for engine, chunk in zip(self.engines, chunks)
+        ]
+        results: List[AnalysisResult] = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+    
+    def __enter__(self) -> 'ChessEnginePool':
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        self.stop()
+        return False  # Don't suppress exceptions
@@ -2,20 +2,24 @@
 Minimal GUI shell for AI Chess Instructor.
 """
 
+import html
+import os
 import sys
 import math
+import queue
 import chess
-from typing import Optional, List
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, List
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QPushButton, QLabel, QTextEdit, QMessageBox, QDialog, QDialogButtonBox,
     QComboBox, QGroupBox
 )
-from PyQt6.QtCore import Qt, QRect, QPointF
-from PyQt6.QtGui import QPainter, QColor, QFont, QBrush, QPolygonF
+from PyQt6.QtCore import Qt, QRect, QPointF, QThread, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QFont, QBrush, QPolygonF, QPixmap, QPixmapCache, QRegion, QTextCursor
 
-from engine import ChessEngine
+from engine import ChessEngine, position_key
 from instructor import (
     assess_move,
     analyze_pre_move_threats,
@@ -40,7 +44,17 @@ from stats import (
 
 STOCKFISH_PATH = r"D:\CODE\PROJECTS\Chess Stockfish\stockfish\stockfish-windows-x86-64-avx2.exe"
 ENGINE_DEPTH = 15
+ENGINE_BEFORE_DEPTH = 12  # Pre-move search only ranks candidates; the graded score uses ENGINE_DEPTH
+ENGINE_NODES = None  # e.g. 200_000: fixed node budget instead of depth (bounded latency)
 ENGINE_MOVE_TIME = 1.0
+ENGINE_REUSE_ANALYSIS = True  # Engine replies with the move found while grading the player's move
+ENGINE_PONDER = True  # Keep searching the player's position while they think
+ENGINE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".chess_analyzer_cache.sqlite")
+ENGINE_CACHE_SIZE = 4096  # In-memory positions; kept across undo / new game
+ENGINE_MULTIPV = 3  # Lines per analysis; the extra ones are shown as alternatives
+# Show those alternatives. Off: the pre-move analysis only needs score and best
+# move, so the position seeded by the engine's last reply is used as is
+ENGINE_SHOW_ALTERNATIVES = True
 
 
 # =========================
@@ -53,11 +67,103 @@ HIGHLIGHT_SQUARE = QColor(130, 151, 105)
 LAST_MOVE_HIGHLIGHT = QColor(205, 210, 106)
 LEGAL_MOVE_DOT = QColor(0, 0, 0, 50)
 
+# Paint objects shared by every repaint (not rebuilt per square / per arrow)
+DANGER_HIGHLIGHT = QColor(255, 0, 0, 100)
+WARNING_HIGHLIGHT = QColor(255, 165, 0, 100)
+DOT_BRUSH = QBrush(LEGAL_MOVE_DOT)
+BEST_ARROW_BRUSH = QBrush(QColor(0, 200, 0, 180))
+THREAT_ARROW_BRUSH = QBrush(QColor(255, 0, 0, 180))
+
 PIECE_UNICODE = {
     'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
     'k': '♚', 'q': '♛', 'r': '♜', 'b': '♝', 'n': '♞', 'p': '♟'
 }
 
+
+def _glyph_index(color, piece_type):
+    # Flat table index: no symbol() string / dict hash on the paint path
+    return (color << 3) | piece_type
+
+
+def _build_piece_glyphs():
+    # PIECE_UNICODE re-indexed by _glyph_index (gaps stay None)
+    glyphs = [None] * 16
+    for symbol, glyph in PIECE_UNICODE.items():
+        piece = chess.Piece.from_symbol(symbol)
+        glyphs[_glyph_index(piece.color, piece.piece_type)] = glyph
+    assert sum(g is not None for g in glyphs) == 12
+    return glyphs
+
+
+PIECE_GLYPHS = _build_piece_glyphs()
+
+# Board widget: positions whose per-square legal destinations are kept
+LEGAL_DEST_CACHE_SIZE = 512
+
+# SAN strings keyed by (position, move); undo / replays reuse them
+SAN_CACHE_SIZE = 1024
+_san_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+
+def _san(board, move):
+    key = (position_key(board), move)
+    san = _san_cache.get(key)
+    if san is None:
+        san = board.san(move)
+        _san_cache[key] = san
+        if len(_san_cache) > SAN_CACHE_SIZE:
+            _san_cache.popitem(last=False)
+    else:
+        _san_cache.move_to_end(key)
+    return san
+
+
+class TrackedBoard(chess.Board):
+    """chess.Board that counts positions as moves are pushed and popped.
+
+    is_repetition() (and with it outcome()'s fivefold check) becomes a
+    counter lookup instead of replaying the move stack.
+    """
+
+    def push(self, move):
+        super().push(move)
+        self._rep_counter[position_key(self)] += 1
+
+    def pop(self):
+        key = position_key(self)
+        self._rep_counter[key] -= 1
+        if not self._rep_counter[key]:
+            del self._rep_counter[key]  # don't let popped probes pile up as zeros
+        return super().pop()
+
+    def clear_stack(self):
+        # Called by reset() / set_fen() / clear() once the new position is set
+        super().clear_stack()
+        self._rep_counter = Counter({position_key(self): 1})
+
+    def copy(self, *, stack=True):
+        board = super().copy(stack=stack)
+        if stack is True:
+            board._rep_counter = self._rep_counter.copy()
+        else:
+            board._recount()
+        return board
+
+    def _recount(self):
+        # Rebuild from the move stack (partial copies only)
+        counter = Counter({position_key(self): 1})
+        switchyard = []
+        while self.move_stack:
+            switchyard.append(chess.Board.pop(self))
+            counter[position_key(self)] += 1
+        while switchyard:
+            chess.Board.push(self, switchyard.pop())
+        self._rep_counter = counter
+
+    def is_repetition(self, count=3):
+        return self._rep_counter[position_key(self)] >= count
+
+
 GRADE_COLORS = {
     MoveGrade.BEST: "#22c55e",
     MoveGrade.EXCELLENT: "#22c55e",
@@ -67,6 +173,23 @@ GRADE_COLORS = {
     MoveGrade.BLUNDER: "#a855f7",
 }
 
+# Assessment panel HTML, filled with str.format per move
+NOTE_HTML = "<i>Note: {warning}</i><br><br>"
+ASSESSMENT_HTML = (
+    "<b>Your move:</b> {move_san}<br>"
+    "<b>Eval:</b> {eval_initial:+.2f} → {eval_final:+.2f}<br>"
+)
+# Grade line only depends on the grade: built once per grade, not per move
+GRADE_HTML = {
+    grade: f"<b>Grade:</b> <span style='color:{color}'>{grade.name}</span><br>"
+    for grade, color in GRADE_COLORS.items()
+}
+BEST_MOVE_HTML = "<b>Best was:</b> {best_san}<br>"
+ALTERNATIVES_HTML = "<b>Alternatives:</b> {alternatives}<br>"
+EXPLANATION_HTML = "<br>{explanation}"
+ENGINE_MOVE_HTML = "<br><br><b>Engine plays:</b> {engine_san}"
+ENGINE_MOVE_ERROR_HTML = "<br><br><b>Engine error:</b> {message}<br>Your move was taken back."
+
 
 # =========================
 # PROFILE DIALOG
@@ -228,118 +351,257 @@ class ChessBoardWidget(QWidget):
         self.board: Optional[chess.Board] = None
         self.selected_square = None
         self.legal_destinations: List[int] = []
+        self._shown_pieces: Dict[int, chess.Piece] = {}  # Placement as of last set_board
+        self._piece_blits: List[tuple] = []  # (x, y, rect, pixmap) per piece, resolved in apply_state
+        # from_square -> {to_square: move} for the current position; built in
+        # one pass over legal_moves on the first click (None until then)
+        self._moves_by_from: Optional[Dict[int, Dict[int, chess.Move]]] = None
+        # Position -> its _moves_by_from map, so undo / revisits reuse them
+        self._dest_cache: "OrderedDict[tuple, Dict[int, Dict[int, chess.Move]]]" = OrderedDict()
         self.last_move = None
-        self.visual_cues = None
+        # Visual cues, resolved once in set_visual_cues: (square, type) / (polygon, brush, bounds)
+        self._highlights: List[tuple] = []
+        self._arrows: List[tuple] = []
         self.on_move_callback = None
         self.interaction_enabled = True
 
         self.square_size = 64
         self.setFixedSize(8 * self.square_size, 8 * self.square_size)
+        self._build_square_tables()
+        self._build_piece_pixmaps()
+        self._rebuild_background()
+
+    def _rebuild_background(self):
+        # Static checkerboard painted once; paintEvent blits it and only
+        # overdraws the selected / last-move squares
+        self._board_bg = QPixmap(8 * self.square_size, 8 * self.square_size)
+        painter = QPainter(self._board_bg)
+        for sq in chess.SQUARES:
+            self._fill_square(painter, sq, self._sq_color[sq])
+        painter.end()
 
-    def set_board(self, board: chess.Board):
+    def _build_piece_pixmaps(self):
+        # Shape/rasterize each of the 12 glyphs once; paint just blits them.
+        # Must be rebuilt if square_size ever changes.
+        # Indexed like PIECE_GLYPHS. Pixmaps go through the global
+        # QPixmapCache, so every board widget of the same size shares them.
+        self._piece_pixmaps = [None] * len(PIECE_GLYPHS)
+        font = QFont("Segoe UI Symbol", 40)
+        for index, glyph in enumerate(PIECE_GLYPHS):
+            if glyph is None:
+                continue
+            key = f"chess_piece:{index}:{self.square_size}"
+            pixmap = QPixmapCache.find(key)
+            if pixmap is not None:
+                self._piece_pixmaps[index] = pixmap
+                continue
+            pixmap = QPixmap(self.square_size, self.square_size)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(font)
+            is_white = index >> 3 == chess.WHITE
+            painter.setPen(QColor(255, 255, 255) if is_white else QColor(0, 0, 0))
+            painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, glyph)
+            painter.end()
+            QPixmapCache.insert(key, pixmap)
+            self._piece_pixmaps[index] = pixmap
+
+    def _build_square_tables(self):
+        # Per-square top-left pixel, rect, center and base color, computed once (not per paint)
+        sz = self.square_size
+        half = sz // 2
+        self._sq_xy = [
+            ((sq & 7) * sz, (7 - (sq >> 3)) * sz)
+            for sq in chess.SQUARES
+        ]
+        self._sq_rects = [QRect(x, y, sz, sz) for x, y in self._sq_xy]
+        self._sq_centers = [(x + half, y + half) for x, y in self._sq_xy]
+        # (from_sq, to_sq) -> arrow QPolygonF (None if too short); pixel geometry
+        self._arrow_cache = {}
+        self._sq_color = [
+            LIGHT_SQUARE if ((sq & 7) + (sq >> 3)) % 2 else DARK_SQUARE
+            for sq in chess.SQUARES
+        ]
+
+    def apply_state(self, board: chess.Board, last_move=None, interactive=True):
+        # Board + last move + interactivity as one change: selection is cleared
+        # and a single update() covers every square that differs on screen
+        # piece_map() walks occupied squares only (<= 32), not all 64
+        pieces = board.piece_map()
+        shown = self._shown_pieces
+        squares = [sq for sq in pieces.keys() | shown.keys() if pieces.get(sq) != shown.get(sq)]
+        for m in (self.last_move, last_move):
+            if m:
+                squares.append(m.from_square)
+                squares.append(m.to_square)
+        squares.extend(self.legal_destinations)
+        if self.selected_square is not None:
+            squares.append(self.selected_square)
+
+        first_board = self.board is None
         self.board = board
+        self._shown_pieces = pieces
+        self._piece_blits = [
+            (*self._sq_xy[sq], self._sq_rects[sq], self._piece_pixmaps[_glyph_index(p.color, p.piece_type)])
+            for sq, p in pieces.items()
+        ]
+        key = position_key(board)
+        self._moves_by_from = self._dest_cache.get(key)
+        if self._moves_by_from is not None:
+            self._dest_cache.move_to_end(key)
+        self.last_move = last_move
+        self.interaction_enabled = interactive
         self.selected_square = None
         self.legal_destinations = []
-        self.update()
+        if first_board:
+            self.update()
+        else:
+            self._invalidate_squares(squares)
+
+    def set_board(self, board: chess.Board):
+        self.apply_state(board, self.last_move, self.interaction_enabled)
+
+    def reset_board(self, board: chess.Board):
+        # Fresh position (undo / new game): drop last move, cues and selection
+        if self._highlights or self._arrows:
+            self.set_visual_cues(None)
+        self.apply_state(board, None, interactive=True)
 
     def set_last_move(self, move):
+        # Only the old and new from/to squares change
+        squares = []
+        for m in (self.last_move, move):
+            if m:
+                squares.append(m.from_square)
+                squares.append(m.to_square)
         self.last_move = move
-        self.update()
+        self._invalidate_squares(squares)
 
     def set_visual_cues(self, cues):
-        self.visual_cues = cues
+        # Malformed entries are dropped here, once, instead of being
+        # looked up and try/except-ed on every repaint
+        highlights = []
+        arrows = []
+        if cues:
+            for h in cues.get("highlights", []):
+                try:
+                    if 0 <= h["square"] < 64:
+                        highlights.append((h["square"], h["type"]))
+                except (KeyError, TypeError):
+                    pass
+            for a in cues.get("arrows", []):
+                try:
+                    if not (0 <= a["from"] < 64 and 0 <= a["to"] < 64):
+                        continue
+                    points = self._arrow_points(a["from"], a["to"])
+                    brush = BEST_ARROW_BRUSH if a["type"] == "best" else THREAT_ARROW_BRUSH
+                except (KeyError, TypeError):
+                    continue
+                if points is not None:
+                    arrows.append((points, brush, points.boundingRect().toAlignedRect()))
+        self._highlights = highlights
+        self._arrows = arrows
         self.update()
 
     def set_interaction_enabled(self, enabled):
         self.interaction_enabled = enabled
         if not enabled:
-            self.selected_square = None
-            self.legal_destinations = []
-            self.update()
-
-    def paintEvent(self, _):
+            self._set_selection(None, [])
+
+    def _invalidate_squares(self, squares):
+        # One update() with the union of the changed squares, not the whole widget
+        region = QRegion()
+        for sq in squares:
+            region = region.united(self._sq_rects[sq])
+        if not region.isEmpty():
+            self.update(region)
+
+    def _set_selection(self, square, destinations):
+        # Invalidate old and new selection squares + destination dots only
+        squares = list(self.legal_destinations)
+        squares.extend(destinations)
+        for sq in (self.selected_square, square):
+            if sq is not None:
+                squares.append(sq)
+        self.selected_square = square
+        self.legal_destinations = destinations
+        self._invalidate_squares(squares)
+
+    def paintEvent(self, event):
         if not self.board:
             return
 
+        # Painter is clipped to the dirty region; skip per-square work outside it.
+        # The region itself, not its bounding rect: a last-move update touches
+        # squares that can be far apart.
+        clip = event.region()
+        if clip.isEmpty():
+            return
         painter = QPainter(self)
 
-        for sq in chess.SQUARES:
-            self._draw_square(painter, sq)
+        painter.drawPixmap(0, 0, self._board_bg)
+        if self.selected_square is not None:
+            self._fill_square(painter, self.selected_square, HIGHLIGHT_SQUARE)
+        if self.last_move:
+            self._fill_square(painter, self.last_move.from_square, LAST_MOVE_HIGHLIGHT)
+            self._fill_square(painter, self.last_move.to_square, LAST_MOVE_HIGHLIGHT)
 
         # Draw highlights BEFORE pieces
-        if self.visual_cues:
-            highlights = self.visual_cues.get("highlights", [])
-            for h in highlights:
-                try:
-                    self._draw_highlight(painter, h["square"], h["type"])
-                except:
-                    pass
+        for square, highlight_type in self._highlights:
+            if clip.intersects(self._sq_rects[square]):
+                self._draw_highlight(painter, square, highlight_type)
 
+        painter.setBrush(DOT_BRUSH)
+        painter.setPen(Qt.PenStyle.NoPen)
         for sq in self.legal_destinations:
-            self._draw_dot(painter, sq)
+            if clip.intersects(self._sq_rects[sq]):
+                self._draw_dot(painter, sq)
 
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if piece:
-                self._draw_piece(painter, sq, piece)
+        # Pixmap and position per piece were resolved in apply_state:
+        # no color / type lookups here
+        for x, y, rect, pixmap in self._piece_blits:
+            if clip.intersects(rect):
+                painter.drawPixmap(x, y, pixmap)
 
         # Draw arrows AFTER pieces
-        if self.visual_cues:
-            arrows = self.visual_cues.get("arrows", [])
-            for a in arrows:
-                try:
-                    self._draw_arrow(painter, a["from"], a["to"], a["type"])
-                except:
-                    pass
+        painter.setPen(Qt.PenStyle.NoPen)
+        for points, brush, bounds in self._arrows:
+            if clip.intersects(bounds):
+                painter.setBrush(brush)
+                painter.drawPolygon(points)
 
         painter.end()
 
-    def _draw_square(self, painter, sq):
-        x = chess.square_file(sq) * self.square_size
-        y = (7 - chess.square_rank(sq)) * self.square_size
-        rect = QRect(x, y, self.square_size, self.square_size)
-
-        if self.last_move and sq in (self.last_move.from_square, self.last_move.to_square):
-            color = LAST_MOVE_HIGHLIGHT
-        elif sq == self.selected_square:
-            color = HIGHLIGHT_SQUARE
-        else:
-            color = LIGHT_SQUARE if (chess.square_file(sq) + chess.square_rank(sq)) % 2 else DARK_SQUARE
-
-        painter.fillRect(rect, color)
+    def _fill_square(self, painter, sq, color):
+        painter.fillRect(self._sq_rects[sq], color)
 
     def _draw_highlight(self, painter, square, highlight_type):
-        x = chess.square_file(square) * self.square_size
-        y = (7 - chess.square_rank(square)) * self.square_size
-        rect = QRect(x, y, self.square_size, self.square_size)
-        
         if highlight_type == "danger":
-            color = QColor(255, 0, 0, 100)
+            color = DANGER_HIGHLIGHT
         else:
-            color = QColor(255, 165, 0, 100)
+            color = WARNING_HIGHLIGHT
         
-        painter.fillRect(rect, color)
-
-    def _draw_arrow(self, painter, from_sq, to_sq, arrow_type):
-        from_x = chess.square_file(from_sq) * self.square_size + self.square_size // 2
-        from_y = (7 - chess.square_rank(from_sq)) * self.square_size + self.square_size // 2
-        to_x = chess.square_file(to_sq) * self.square_size + self.square_size // 2
-        to_y = (7 - chess.square_rank(to_sq)) * self.square_size + self.square_size // 2
-        
-        if arrow_type == "best":
-            color = QColor(0, 200, 0, 180)
-        else:
-            color = QColor(255, 0, 0, 180)
-        
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(QBrush(color))
+        painter.fillRect(self._sq_rects[square], color)
+
+    def _arrow_points(self, from_sq, to_sq):
+        key = (from_sq, to_sq)
+        if key in self._arrow_cache:
+            return self._arrow_cache[key]
+        points = self._arrow_cache[key] = self._arrow_polygon(from_sq, to_sq)
+        return points
+
+    def _arrow_polygon(self, from_sq, to_sq):
+        # Geometry depends only on the two squares (color is the brush),
+        # so each polygon is built once and kept in _arrow_cache
+        from_x, from_y = self._sq_centers[from_sq]
+        to_x, to_y = self._sq_centers[to_sq]
         
         dx = to_x - from_x
         dy = to_y - from_y
         length = math.sqrt(dx * dx + dy * dy)
         
         if length < 5:
-            return
+            return None
         
         angle = math.atan2(dy, dx)
         
@@ -366,23 +628,37 @@ class ChessBoardWidget(QWidget):
                             from_y + sin_a * shaft_end + perp_x * head_width / shaft_width))
         points.append(QPointF(from_x + cos_a * shaft_end + perp_x, from_y + sin_a * shaft_end + perp_y))
         
-        painter.drawPolygon(points)
+        return points
 
     def _draw_dot(self, painter, sq):
-        cx = chess.square_file(sq) * self.square_size + self.square_size // 2
-        cy = (7 - chess.square_rank(sq)) * self.square_size + self.square_size // 2
-        painter.setBrush(QBrush(LEGAL_MOVE_DOT))
-        painter.setPen(Qt.PenStyle.NoPen)
+        # Brush / pen are set once per paint in paintEvent
+        cx, cy = self._sq_centers[sq]
         painter.drawEllipse(cx - 10, cy - 10, 20, 20)
 
-    def _draw_piece(self, painter, sq, piece):
-        x = chess.square_file(sq) * self.square_size
-        y = (7 - chess.square_rank(sq)) * self.square_size
-        rect = QRect(x, y, self.square_size, self.square_size)
-
-        painter.setFont(QFont("Segoe UI Symbol", 40))
-        painter.setPen(QColor(255, 255, 255) if piece.color else QColor(0, 0, 0))
-        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, PIECE_UNICODE[piece.symbol()])
+    def _legal_moves_by_from(self):
+        # One pass over legal_moves per position; every later click on any
+        # piece is a lookup
+        if self._moves_by_from is None:
+            moves_by_from = {}
+            for m in self.board.legal_moves:
+                if m.promotion and m.promotion != chess.QUEEN:
+                    continue  # auto-queen: one move per destination
+                moves_by_from.setdefault(m.from_square, {})[m.to_square] = m
+            self._moves_by_from = moves_by_from
+            key = position_key(self.board)
+            self._dest_cache[key] = moves_by_from
+            self._dest_cache.move_to_end(key)
+            if len(self._dest_cache) > LEGAL_DEST_CACHE_SIZE:
+                self._dest_cache.popitem(last=False)
+        return self._moves_by_from
+
+    def _get_legal_destinations(self, from_square):
+        return list(self._legal_moves_by_from().get(from_square, ()))
+
+    def _create_move(self, from_sq, to_sq):
+        # Only called for legal destinations: reuse the generated move
+        # (promotions are already queen)
+        return self._legal_moves_by_from()[from_sq][to_sq]
 
     def mousePressEvent(self, event):
         if not self.interaction_enabled or not self.board or self.board.turn != chess.WHITE:
@@ -393,41 +669,111 @@ class ChessBoardWidget(QWidget):
         if not (0 <= file <= 7 and 0 <= rank <= 7):
             return
 
-        sq = chess.square(file, rank)
+        sq = (rank << 3) | file
 
         if sq in self.legal_destinations:
-            from_sq = self.selected_square
-            to_sq = sq
+            move = self._create_move(self.selected_square, sq)
             
-            piece = self.board.piece_at(from_sq)
-            if piece and piece.piece_type == chess.PAWN:
-                to_rank = chess.square_rank(to_sq)
-                if (piece.color == chess.WHITE and to_rank == 7) or \
-                   (piece.color == chess.BLACK and to_rank == 0):
-                    move = chess.Move(from_sq, to_sq, promotion=chess.QUEEN)
-                else:
-                    move = chess.Move(from_sq, to_sq)
-            else:
-                move = chess.Move(from_sq, to_sq)
-            
-            self.selected_square = None
-            self.legal_destinations = []
-            self.update()
+            self._set_selection(None, [])
             if self.on_move_callback:
                 self.on_move_callback(move)
             return
 
-        piece = self.board.piece_at(sq)
-        if piece and piece.color == chess.WHITE:
-            self.selected_square = sq
-            self.legal_destinations = [
-                m.to_square for m in self.board.legal_moves if m.from_square == sq
-            ]
-            self.update()
+        if self.board.occupied_co[chess.WHITE] & chess.BB_SQUARES[sq]:
+            self._set_selection(sq, self._get_legal_destinations(sq))
         else:
-            self.selected_square = None
-            self.legal_destinations = []
-            self.update()
+            self._set_selection(None, [])
+
+
+# =========================
+# ENGINE WORKER
+# =========================
+
+class EngineWorker(QThread):
+    """Runs engine analysis and engine moves off the GUI thread so the window stays responsive."""
+    
+    _ANALYZE = 0
+    _MOVE = 1
+    
+    # (context, MoveAnalysis)
+    analysis_ready = pyqtSignal(object, object)
+    # (context, chess.Move or None)
+    move_ready = pyqtSignal(object, object)
+    # (context, error message)
+    analysis_failed = pyqtSignal(object, str)
+    # (context, error message) for a failed engine reply
+    move_failed = pyqtSignal(object, str)
+    # Engine process is up (emitted once, from run())
+    engine_ready = pyqtSignal()
+    # Engine process failed to start (the exception); the worker then exits
+    engine_failed = pyqtSignal(object)
+    
+    def __init__(self, engine: ChessEngine):
+        super().__init__()
+        self.engine = engine
+        self._jobs: "queue.Queue" = queue.Queue()
+    
+    def submit(self, context, board: chess.Board, move: chess.Move):
+        # Taken as is: the caller hands over a snapshot it no longer mutates
+        # (_handle_player_move's board_before), so no second copy is made
+        self._jobs.put((self._ANALYZE, context, board, move))
+    
+    def submit_move(self, context, board: chess.Board, time_limit: float):
+        # Snapshot the board so the GUI can keep mutating its own copy
+        self._jobs.put((self._MOVE, context, board.copy(stack=False), time_limit))
+    
+    def shutdown(self):
+        self._jobs.put(None)
+        self.wait()
+    
+    def run(self):
+        # Spawning Stockfish and the UCI handshake happen here, not on the GUI thread
+        try:
+            self.engine.start()
+        except Exception as e:
+            self.engine_failed.emit(e)
+            return
+        self.engine_ready.emit()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            kind, context, board, arg = job
+            try:
+                if kind == self._ANALYZE:
+                    result = self.engine.analyze_with_move(
+                        board,
+                        arg,
+                        before_depth=min(ENGINE_BEFORE_DEPTH, ENGINE_DEPTH),
+                        before_multipv=None if ENGINE_SHOW_ALTERNATIVES else 1
+                    )
+                else:
+                    result = self.engine.get_move(board, time_limit=arg, reuse_analysis=ENGINE_REUSE_ANALYSIS)
+            except Exception as e:
+                if kind == self._ANALYZE:
+                    self.analysis_failed.emit(context, str(e))
+                else:
+                    self.move_failed.emit(context, str(e))
+                continue
+            if kind == self._ANALYZE:
+                self.analysis_ready.emit(context, result)
+            else:
+                self.move_ready.emit(context, result)
+                if ENGINE_PONDER and result is not None:
+                    self._ponder(board, result)
+    
+    def _ponder(self, board: chess.Board, engine_move: chess.Move):
+        # Search the player's position until the next job arrives; that job's
+        # analyze() stops it and its snapshot lands in the engine cache, so
+        # the player's 'before' analysis is done or mostly done by then
+        board.push(engine_move)
+        if board.is_game_over():
+            return
+        try:
+            self.engine.start_analysis(board)
+        except Exception:
+            pass  # Pondering is best-effort; the next job searches normally
 
 
 # =========================
@@ -440,18 +786,22 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("AI Chess Instructor")
 
         self.instructor_mode = "adaptive"
-        self.board = chess.Board()
+        self.board = TrackedBoard()
         self.engine: Optional[ChessEngine] = None
+        self.engine_worker: Optional[EngineWorker] = None
+        # Player move waiting on the worker's analysis (None when idle)
+        self._pending_move = None
         self.player_is_white = True
-        self.undo_fen = None
+        self._undo_depth = 0  # Plies pushed since the last player move began (undo pops them)
         self.game_active = False
 
         self._build_ui()
-        self._init_engine()
-        
         self.board_widget.set_board(self.board)
         self._start_new_game()
 
+        # Engine starts on the worker thread; the window shows right away
+        self._init_engine()
+
     def _build_ui(self):
         root = QWidget()
         self.setCentralWidget(root)
@@ -520,19 +870,55 @@ class MainWindow(QMainWindow):
         side.addLayout(btn_layout2)
 
     def _init_engine(self):
-        try:
-            self.engine = ChessEngine(STOCKFISH_PATH, depth=ENGINE_DEPTH)
-            self.engine.start()
-        except FileNotFoundError:
+        # self.engine stays None (moves are refused) until engine_ready arrives
+        engine = ChessEngine(
+            STOCKFISH_PATH,
+            depth=ENGINE_DEPTH,
+            nodes=ENGINE_NODES,
+            cache_path=ENGINE_CACHE_PATH,
+            cache_size=ENGINE_CACHE_SIZE,
+            multipv=ENGINE_MULTIPV
+        )
+        self.engine_worker = EngineWorker(engine)
+        self.engine_worker.engine_ready.connect(
+            self._on_engine_ready, Qt.ConnectionType.QueuedConnection
+        )
+        self.engine_worker.engine_failed.connect(
+            self._on_engine_failed, Qt.ConnectionType.QueuedConnection
+        )
+        self.engine_worker.analysis_ready.connect(
+            self._on_analysis_ready, Qt.ConnectionType.QueuedConnection
+        )
+        self.engine_worker.move_ready.connect(
+            self._on_engine_move, Qt.ConnectionType.QueuedConnection
+        )
+        self.engine_worker.analysis_failed.connect(
+            self._on_analysis_failed, Qt.ConnectionType.QueuedConnection
+        )
+        self.engine_worker.move_failed.connect(
+            self._on_engine_move_failed, Qt.ConnectionType.QueuedConnection
+        )
+        self.board_widget.set_interaction_enabled(False)
+        self._update_status("Initializing engine...")
+        self.engine_worker.start()
+
+    def _on_engine_ready(self):
+        self.engine = self.engine_worker.engine
+        self.board_widget.set_interaction_enabled(True)
+        self._update_status_display()
+
+    def _on_engine_failed(self, error):
+        if isinstance(error, FileNotFoundError):
             QMessageBox.critical(
                 self,
                 "Engine Not Found",
                 f"Stockfish not found at:\n{STOCKFISH_PATH}\n\nPlease update STOCKFISH_PATH in gui.py"
             )
-            self.engine = None
-        except Exception as e:
-            QMessageBox.critical(self, "Engine Error", f"Failed to start engine:\n{e}")
-            self.engine = None
+        else:
+            QMessageBox.critical(self, "Engine Error", f"Failed to start engine:\n{error}")
+        self.engine = None
+        self.board_widget.set_interaction_enabled(True)
+        self._update_status_display()
 
     def _on_mode_changed(self, mode: str):
         self.instructor_mode = mode
@@ -581,20 +967,23 @@ class MainWindow(QMainWindow):
         self._update_stats_bar()
 
     def _check_game_over(self):
-        if not self.board.is_game_over():
+        # One outcome() call answers game-over, result and reason together;
+        # is_game_over() + result() + is_checkmate() ... would redo the work
+        outcome = self.board.outcome()
+        if outcome is None:
             return False
         
         self.board_widget.set_interaction_enabled(False)
         self.game_active = False
         
-        result = self.board.result()
+        result = outcome.result()
         
-        if self.board.is_checkmate():
-            winner = "Black" if self.board.turn == chess.WHITE else "White"
+        if outcome.termination == chess.Termination.CHECKMATE:
+            winner = "White" if outcome.winner == chess.WHITE else "Black"
             self._update_status(f"Checkmate! {winner} wins!")
-        elif self.board.is_stalemate():
+        elif outcome.termination == chess.Termination.STALEMATE:
             self._update_status("Draw by stalemate")
-        elif self.board.is_insufficient_material():
+        elif outcome.termination == chess.Termination.INSUFFICIENT_MATERIAL:
             self._update_status("Draw - insufficient material")
         else:
             self._update_status(f"Game over: {result}")
@@ -626,20 +1015,47 @@ class MainWindow(QMainWindow):
             self.instructor_mode
         )
 
-        self.undo_fen = self.board.fen()
+        # Kept in the job context so a failed analysis can give Undo back
+        prev_undo_depth = self._undo_depth
+        self._undo_depth = 0
 
-        analysis_before = self.engine.analyze(self.board)
-        board_before = self.board.copy()
-
-        board_after = self.board.copy()
+        # Analysis and assessment never look at the move stack
+        board_before = self.board.copy(stack=False)
+        board_after = self.board.copy(stack=False)
         board_after.push(move)
-        analysis_after = self.engine.analyze(board_after)
+
+        # Analysis runs on the worker; the rest continues in _on_analysis_ready.
+        # The move is shown right away; self.board only takes it once assessed.
+        self._pending_move = (move, board_before, board_after, warning, prev_undo_depth)
+        self.board_widget.apply_state(board_after, move, interactive=False)
+        self.undo_btn.setEnabled(False)
+        self._update_status("Analyzing...")
+        self.engine_worker.submit(self._pending_move, board_before, move)
+
+    def _on_analysis_failed(self, context, message):
+        if context is not self._pending_move:
+            return  # stale job (undo / new game happened meanwhile)
+        self._pending_move = None
+        # Take back the optimistically shown move (if any); the previous
+        # exchange is still on the board, so it can still be undone
+        self._undo_depth = context[-1]
+        self.undo_btn.setEnabled(bool(self._undo_depth))
+        last_move = self.board.peek() if self.board.move_stack else None
+        self.board_widget.apply_state(self.board, last_move, interactive=True)
+        self._show_message(f"Engine error: {message}")
+        self._update_status_display()
+
+    def _on_analysis_ready(self, context, analysis):
+        if context is not self._pending_move:
+            return  # stale job (undo / new game happened meanwhile)
+        self._pending_move = None
+        move, board_before, board_after, warning, _ = context
 
         assessment = assess_move(
             move_played=move,
-            eval_initial=analysis_before.cp_score_white,
-            eval_final=analysis_after.cp_score_white,
-            best_move=analysis_before.best_move,
+            eval_initial=analysis.cp_score_white_before,
+            eval_final=analysis.cp_score_white_after,
+            best_move=analysis.best_move,
             player_is_white=self.player_is_white,
             board_before=board_before,
             board_after=board_after,
@@ -650,29 +1066,40 @@ class MainWindow(QMainWindow):
         record_move(assessment.grade, assessment.explanation)
         self._update_stats_bar()
 
-        move_san = self.board.san(move)
+        move_san = _san(board_before, move)
         best_san = None
         if assessment.best_move and assessment.best_move != move:
             try:
-                best_san = self.board.san(assessment.best_move)
+                best_san = _san(board_before, assessment.best_move)
             except:
                 pass
 
-        grade_color = GRADE_COLORS.get(assessment.grade, "#000000")
-        
-        html = f"<b>Your move:</b> {move_san}<br>"
-        html += f"<b>Eval:</b> {assessment.eval_initial/100:+.2f} → {assessment.eval_final/100:+.2f}<br>"
-        html += f"<b>Grade:</b> <span style='color:{grade_color}'>{assessment.grade.name}</span><br>"
+        # Pieces are collected and joined once, then parsed by setHtml once
+        parts = []
+        if warning:
+            parts.append(NOTE_HTML.format(warning=warning))
+        parts.append(ASSESSMENT_HTML.format(
+            move_san=move_san,
+            eval_initial=assessment.eval_initial / 100,
+            eval_final=assessment.eval_final / 100
+        ))
+        parts.append(GRADE_HTML[assessment.grade])
         
         if best_san and not assessment.was_best_move:
-            html += f"<b>Best was:</b> {best_san}<br>"
+            parts.append(BEST_MOVE_HTML.format(best_san=best_san))
+
+        # Other engine lines from the same search (MultiPV)
+        alternatives = [
+            f"{_san(board_before, alt)} ({cp/100:+.2f})"
+            for alt, cp in analysis.top_moves[1:]
+            if alt != move
+        ] if ENGINE_SHOW_ALTERNATIVES else []
+        if alternatives:
+            parts.append(ALTERNATIVES_HTML.format(alternatives=", ".join(alternatives)))
         
-        html += f"<br>{assessment.explanation}"
-        
-        if warning:
-            html = f"<i>Note: {warning}</i><br><br>" + html
+        parts.append(EXPLANATION_HTML.format(explanation=assessment.explanation))
 
-        self.output.setHtml(html)
+        self.output.setHtml("".join(parts))
 
         # Set visual cues from assessment
         if assessment.visual_cues:
@@ -681,59 +1108,80 @@ class MainWindow(QMainWindow):
             self.board_widget.set_visual_cues(None)
 
         self.board.push(move)
-        self.board_widget.set_board(self.board)
-        self.board_widget.set_last_move(move)
+        self._undo_depth += 1
+        self.board_widget.apply_state(self.board, move, interactive=False)
 
         if self._check_game_over():
             self.undo_btn.setEnabled(True)
             return
 
         self._update_status("Engine thinking...")
-        self.board_widget.set_interaction_enabled(False)
-        QApplication.processEvents()
 
-        engine_move = self.engine.get_move(self.board, time_limit=ENGINE_MOVE_TIME)
-        
+        # Engine reply also runs on the worker; continues in _on_engine_move
+        self._pending_move = ("engine", position_key(self.board))
+        self.engine_worker.submit_move(self._pending_move, self.board, ENGINE_MOVE_TIME)
+
+    def _on_engine_move(self, context, engine_move):
+        if context is not self._pending_move:
+            return  # stale job (undo / new game happened meanwhile)
+        self._pending_move = None
+
         if engine_move:
-            engine_san = self.board.san(engine_move)
+            engine_san = _san(self.board, engine_move)
             self.board.push(engine_move)
-            self.board_widget.set_board(self.board)
-            self.board_widget.set_last_move(engine_move)
+            self._undo_depth += 1
+            self.board_widget.apply_state(self.board, engine_move, interactive=True)
             
-            current_html = self.output.toHtml()
-            self.output.setHtml(current_html + f"<br><b>Engine plays:</b> {engine_san}")
-
-        self.board_widget.set_interaction_enabled(True)
+            # Append at the end; a toHtml()/setHtml() round trip would
+            # serialize and re-parse the whole panel
+            cursor = self.output.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertHtml(ENGINE_MOVE_HTML.format(engine_san=engine_san))
+        else:
+            self.board_widget.set_interaction_enabled(True)
         self.undo_btn.setEnabled(True)
 
         if not self._check_game_over():
             self._update_status_display()
 
+    def _on_engine_move_failed(self, context, message):
+        if context is not self._pending_move:
+            return  # stale job (undo / new game happened meanwhile)
+        # The player's move is already on the board, so it would stay the
+        # engine's turn with no reply coming; take it back instead.
+        # The assessment stays in the panel, the error goes below it.
+        self._take_back()
+        cursor = self.output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertHtml(ENGINE_MOVE_ERROR_HTML.format(message=html.escape(message)))
+        self._update_status_display()
+
     def _undo(self):
-        if not self.undo_fen:
+        if not self._undo_depth:
             return
 
-        self.board = chess.Board(self.undo_fen)
-        self.board_widget.set_board(self.board)
-        self.board_widget.set_last_move(None)
-        self.board_widget.set_visual_cues(None)
-        self.board_widget.set_interaction_enabled(True)
-        self.undo_fen = None
-        self.undo_btn.setEnabled(False)
+        self._take_back()
         self._show_message("Move undone.")
         self._update_status_display()
 
+    def _take_back(self):
+        # Pop the plies pushed since the last player move began; no FEN round trip
+        self._pending_move = None
+        for _ in range(self._undo_depth):
+            self.board.pop()
+        self.board_widget.reset_board(self.board)
+        self._undo_depth = 0
+        self.undo_btn.setEnabled(False)
+
     def _new_game(self):
         # If game is active, end it first
         if self.game_active:
             end_game(None)
         
-        self.board = chess.Board()
-        self.board_widget.set_board(self.board)
-        self.board_widget.set_last_move(None)
-        self.board_widget.set_visual_cues(None)
-        self.board_widget.set_interaction_enabled(True)
-        self.undo_fen = None
+        self._pending_move = None
+        self.board.reset()
+        self.board_widget.reset_board(self.board)
+        self._undo_depth = 0
         self.undo_btn.setEnabled(False)
         reset_adaptive_state()
         
@@ -744,9 +1192,11 @@ class MainWindow(QMainWindow):
         if self.game_active:
             end_game(None)
         
-        if self.engine:
+        if self.engine_worker:
+            self.engine_worker.shutdown()
+            # Worker's engine, in case it finished starting after we stopped listening
             try:
-                self.engine.stop()
+                self.engine_worker.engine.stop()
             except:
                 pass
         event.accept()
@@ -1,3 +1,5 @@
+import re
+from bisect import bisect_left
 from dataclasses import dataclass
 from enum import IntEnum
 from typing import Optional, Dict
@@ -25,7 +27,7 @@ PIECE_VALUES = {
 }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MoveAssessment:
     move_played: chess.Move
     grade: MoveGrade
@@ -46,19 +48,21 @@ def _calculate_centipawn_loss(e0, e1, is_white):
     return (e0 - e1) if is_white else (e1 - e0)
 
 
+# Upper bound (inclusive) of each band's centipawn loss; anything above is a blunder
+_GRADE_THRESHOLDS = (10, 25, 50, 100)
+_GRADES_BY_LOSS = (
+    MoveGrade.EXCELLENT,
+    MoveGrade.GOOD,
+    MoveGrade.INACCURACY,
+    MoveGrade.MISTAKE,
+    MoveGrade.BLUNDER,
+)
+
+
 def _determine_grade(cp_loss, was_best):
     if was_best:
         return MoveGrade.BEST
-    loss = max(0, cp_loss)
-    if loss <= 10:
-        return MoveGrade.EXCELLENT
-    if loss <= 25:
-        return MoveGrade.GOOD
-    if loss <= 50:
-        return MoveGrade.INACCURACY
-    if loss <= 100:
-        return MoveGrade.MISTAKE
-    return MoveGrade.BLUNDER
+    return _GRADES_BY_LOSS[bisect_left(_GRADE_THRESHOLDS, max(0, cp_loss))]
 
 
 def _fallback_explanation(grade):
@@ -76,18 +80,23 @@ def _fallback_explanation(grade):
 # Phase 7 — Visual Cues (FINAL & STABLE)
 # =========================================================
 
+# One scan finds every keyword; groups are listed in priority order
+_VISUAL_REASON_RE = re.compile(
+    r"(?P<constraint>only move|unavoidable|already lost)"
+    r"|(?P<mate>mate)"
+    r"|(?P<fork>fork)"
+    r"|(?P<pin>pin)"
+    r"|(?P<material>hanging|undefended|captured)",
+    re.IGNORECASE
+)
+_VISUAL_REASON_PRIORITY = ("constraint", "mate", "fork", "pin", "material")
+
+
 def _resolve_visual_reason(explanation: str) -> str:
-    e = explanation.lower()
-    if any(x in e for x in ("only move", "unavoidable", "already lost")):
-        return "constraint"
-    if "mate" in e:
-        return "mate"
-    if "fork" in e:
-        return "fork"
-    if "pin" in e:
-        return "pin"
-    if any(x in e for x in ("hanging", "undefended", "captured")):
-        return "material"
+    found = {m.lastgroup for m in _VISUAL_REASON_RE.finditer(explanation)}
+    for reason in _VISUAL_REASON_PRIORITY:
+        if reason in found:
+            return reason
     return "generic"
 
 
@@ -112,19 +121,17 @@ def _generate_visual_cues(
             cues["highlights"].append({"square": k, "type": "danger"})
 
     elif reason == "fork":
-        for sq in chess.SQUARES:
-            p = board_after.piece_at(sq)
-            if p and p.color == opp:
-                targets = [
-                    t for t in board_after.attacks(sq)
-                    if board_after.piece_at(t)
-                    and board_after.piece_at(t).color == player_color
-                    and PIECE_VALUES.get(board_after.piece_at(t).piece_type, 0) >= 300
-                ]
-                if len(targets) >= 2:
-                    for t in targets[:2]:
-                        cues["arrows"].append({"from": sq, "to": t, "type": "threat"})
-                    break
+        # Player's pieces worth >= 300, as one bitboard
+        valuable = chess.BB_EMPTY
+        for piece_type, value in PIECE_VALUES.items():
+            if value >= 300:
+                valuable |= board_after.pieces_mask(piece_type, player_color)
+        for sq in chess.scan_forward(board_after.occupied_co[opp]):
+            targets = board_after.attacks_mask(sq) & valuable
+            if chess.popcount(targets) >= 2:
+                for t in list(chess.scan_forward(targets))[:2]:
+                    cues["arrows"].append({"from": sq, "to": t, "type": "threat"})
+                break
 
     if (
         reason == "generic"
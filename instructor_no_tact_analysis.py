@@ -11,11 +11,15 @@ Design rules:
 - Tactical explanations override generic ones
 """
 
+from bisect import bisect_left
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import IntEnum
 from typing import Optional
 import chess
 
+from engine import position_key
+
 
 # ---------------------------
 # Grading scale (higher = better)
@@ -49,7 +53,7 @@ PIECE_VALUES = {
 # ---------------------------
 # Data container
 # ---------------------------
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MoveAssessment:
     move_played: chess.Move
     grade: MoveGrade
@@ -75,27 +79,27 @@ def _to_player_eval(cp_score_white: int, player_is_white: bool) -> int:
     return cp_score_white if player_is_white else -cp_score_white
 
 
+# Upper bound (inclusive) of each band's centipawn loss; anything above is a blunder
+_GRADE_THRESHOLDS = (10, 25, 50, 100)
+_GRADES_BY_LOSS = (
+    MoveGrade.EXCELLENT,
+    MoveGrade.GOOD,
+    MoveGrade.INACCURACY,
+    MoveGrade.MISTAKE,
+    MoveGrade.BLUNDER,
+)
+
+
 def _determine_grade(cp_loss: int, was_best_move: bool) -> MoveGrade:
     # BEST move always wins
     if was_best_move:
         return MoveGrade.BEST
 
-    loss = max(0, cp_loss)
-
     # Mate-level collapse
-    if loss >= MATE_THRESHOLD:
+    if cp_loss >= MATE_THRESHOLD:
         return MoveGrade.BLUNDER
 
-    if loss <= 10:
-        return MoveGrade.EXCELLENT
-    elif loss <= 25:
-        return MoveGrade.GOOD
-    elif loss <= 50:
-        return MoveGrade.INACCURACY
-    elif loss <= 100:
-        return MoveGrade.MISTAKE
-    else:
-        return MoveGrade.BLUNDER
+    return _GRADES_BY_LOSS[bisect_left(_GRADE_THRESHOLDS, max(0, cp_loss))]
 
 
 # ---------------------------
@@ -119,23 +123,29 @@ def _detect_allowed_mate(board_after: chess.Board, eval_final: int, player_is_wh
     return None
 
 
+def _attacked_mask(board: chess.Board, color: chess.Color) -> chess.Bitboard:
+    # Every square attacked by `color`: one attack lookup per piece, not per square
+    mask = chess.BB_EMPTY
+    for square in chess.scan_reversed(board.occupied_co[color]):
+        mask |= board.attacks_mask(square)
+    return mask
+
+
 def _detect_hung_piece(board_before: chess.Board, board_after: chess.Board, player_color: chess.Color) -> Optional[str]:
     # Detect newly hung piece (attacked, undefended, newly exposed)
 
     opponent = not player_color
 
-    for square in chess.SQUARES:
-        piece = board_after.piece_at(square)
-        if piece is None or piece.color != player_color:
-            continue
-
-        attacked = board_after.is_attacked_by(opponent, square)
-        defended = board_after.is_attacked_by(player_color, square)
-        was_attacked_before = board_before.is_attacked_by(opponent, square)
-
-        if attacked and not defended and not was_attacked_before:
-            piece_name = piece.symbol().upper()
-            return f"You hung your {piece_name}. It is undefended and can be captured."
+    hung = (
+        board_after.occupied_co[player_color]
+        & _attacked_mask(board_after, opponent)
+        & ~_attacked_mask(board_after, player_color)
+        & ~_attacked_mask(board_before, opponent)
+    )
+    if hung:
+        # Lowest square first, same pick as the old a1..h8 scan
+        piece_name = chess.piece_symbol(board_after.piece_type_at(chess.lsb(hung))).upper()
+        return f"You hung your {piece_name}. It is undefended and can be captured."
 
     return None
 
@@ -143,11 +153,17 @@ def _detect_hung_piece(board_before: chess.Board, board_after: chess.Board, play
 def _detect_material_loss(board_before: chess.Board, board_after: chess.Board, player_color: chess.Color) -> Optional[str]:
     # Detect material loss via capture
 
+    # Same piece count: nothing was captured (promotion only adds material)
+    pieces_before = chess.popcount(board_before.occupied_co[player_color])
+    pieces_after = chess.popcount(board_after.occupied_co[player_color])
+    if pieces_before == pieces_after:
+        return None
+
     def material(board: chess.Board, color: chess.Color) -> int:
-        total = 0
-        for piece_type, value in PIECE_VALUES.items():
-            total += len(board.pieces(piece_type, color)) * value
-        return total
+        return sum(
+            value * chess.popcount(board.pieces_mask(piece_type, color))
+            for piece_type, value in PIECE_VALUES.items()
+        )
 
     before = material(board_before, player_color)
     after = material(board_after, player_color)
@@ -165,6 +181,9 @@ def _detect_material_loss(board_before: chess.Board, board_after: chess.Board, p
 def _opponent_can_mate_in_one(board: chess.Board) -> bool:
     # Check if side to move can deliver checkmate in one move
     for move in board.legal_moves:
+        # Only checks can mate; gives_check() is far cheaper than push + is_checkmate()
+        if not board.gives_check(move):
+            continue
         board.push(move)
         is_mate = board.is_checkmate()
         board.pop()
@@ -173,10 +192,10 @@ def _opponent_can_mate_in_one(board: chess.Board) -> bool:
     return False
 
 
-def _get_moves_avoiding_immediate_mate(board: chess.Board) -> list:
+def _get_moves_avoiding_immediate_mate(board: chess.Board, legal_moves: list) -> list:
     # Return list of moves that don't allow opponent to mate in 1
     safe_moves = []
-    for move in board.legal_moves:
+    for move in legal_moves:
         board.push(move)
         can_be_mated = _opponent_can_mate_in_one(board)
         board.pop()
@@ -185,74 +204,75 @@ def _get_moves_avoiding_immediate_mate(board: chess.Board) -> list:
     return safe_moves
 
 
-def _all_moves_lose(board_before: chess.Board, player_is_white: bool, engine) -> bool:
+def _child_evals(board_before: chess.Board, moves: list, player_is_white: bool, engine):
+    # Player-POV eval after each move, in order; None where the engine failed.
+    # Yielded lazily, one search at a time, so callers that stop early skip
+    # the remaining searches.
+    for move in moves:
+        test_board = board_before.copy(stack=False)
+        test_board.push(move)
+        try:
+            result = engine.analyze(test_board)
+        except Exception:
+            yield None
+            continue
+        yield _to_player_eval(result.cp_score_white, player_is_white)
+
+
+def _all_moves_lose(board_before: chess.Board, legal_moves: list, player_is_white: bool, engine) -> bool:
     # Check if all alternatives keep eval <= -800 (player POV). Max 3 moves.
     if engine is None:
         return False
     
-    checked = 0
-    for move in board_before.legal_moves:
-        if checked >= 3:
-            break
-        checked += 1
-        test_board = board_before.copy()
-        test_board.push(move)
-        try:
-            result = engine.analyze(test_board)
-            alt_eval = _to_player_eval(result.cp_score_white, player_is_white)
-            if alt_eval > -800:
-                return False
-        except:
+    for alt_eval in _child_evals(board_before, legal_moves[:3], player_is_white, engine):
+        if alt_eval is None:
             return False  # Assume not lost on error
+        if alt_eval > -800:
+            return False
     return True
 
 
-def _get_viable_alternatives(board_before: chess.Board, move_played: chess.Move,
+def _get_viable_alternatives(board_before: chess.Board, legal_moves: list, move_played: chess.Move,
                              played_eval: int, player_is_white: bool, engine) -> int:
     # Count moves within 200cp of played move. Limited to 6 moves.
-    legal_moves = list(board_before.legal_moves)
     if len(legal_moves) > 6:
         return 2  # Assume multiple viable when too many to check
     
-    viable_count = 0
-    for move in legal_moves:
-        if move == move_played:
-            viable_count += 1
-            continue
-        test_board = board_before.copy()
-        test_board.push(move)
-        try:
-            result = engine.analyze(test_board)
-            alt_eval = _to_player_eval(result.cp_score_white, player_is_white)
-            if alt_eval >= played_eval - 200:
-                viable_count += 1
-        except:
+    alternatives = [move for move in legal_moves if move != move_played]
+    viable_count = len(legal_moves) - len(alternatives)
+    for alt_eval in _child_evals(board_before, alternatives, player_is_white, engine):
+        if alt_eval is None:
             viable_count += 1  # Assume viable on error
+        elif alt_eval >= played_eval - 200:
+            viable_count += 1
     return viable_count
 
 
-def _saving_move_exists(board_before: chess.Board, move_played: chess.Move,
+def _saving_move_exists(board_before: chess.Board, legal_moves: list, move_played: chess.Move,
                         player_is_white: bool, engine) -> bool:
     # Check if any alternative keeps position reasonable. Max 3 moves.
-    checked = 0
-    for move in board_before.legal_moves:
-        if move == move_played:
-            continue
-        if checked >= 3:
-            break
-        checked += 1
-        test_board = board_before.copy()
-        test_board.push(move)
-        try:
-            result = engine.analyze(test_board)
-            alt_eval = _to_player_eval(result.cp_score_white, player_is_white)
-            if alt_eval >= -100:
-                return True
-        except:
-            pass
+    alternatives = [move for move in legal_moves if move != move_played][:3]
+    for alt_eval in _child_evals(board_before, alternatives, player_is_white, engine):
+        if alt_eval is not None and alt_eval >= -100:
+            return True
     return False
 
 
+# Verdicts keyed by (position, move, evals, side, engine + its search settings);
+# transpositions and repeated review passes skip the legal-move walks and
+# engine calls. A different engine, depth or node budget never shares an entry.
+CONSTRAINT_CACHE_SIZE = 4096
+_constraint_cache: "OrderedDict[tuple, Optional[str]]" = OrderedDict()
+_MISSING = object()
+
+
+def _engine_key(engine) -> Optional[tuple]:
+    # Which engine answers, and how deep it searches
+    if engine is None:
+        return None
+    return (id(engine), getattr(engine, "depth", None), getattr(engine, "nodes", None))
+
+
 def analyze_constraints(
     board_before: chess.Board,
     move_played: chess.Move,
@@ -262,16 +282,39 @@ def analyze_constraints(
     engine=None
 ) -> Optional[str]:
     # Detect forced positions. Priority: FORCED LOSS > ONLY MOVE > IGNORED THREAT
-    
+    key = (position_key(board_before), move_played, eval_initial, eval_final,
+           player_is_white, _engine_key(engine))
+    verdict = _constraint_cache.get(key, _MISSING)
+    if verdict is _MISSING:
+        verdict = _find_constraint(
+            board_before, move_played, eval_initial, eval_final, player_is_white, engine
+        )
+        _constraint_cache[key] = verdict
+        if len(_constraint_cache) > CONSTRAINT_CACHE_SIZE:
+            _constraint_cache.popitem(last=False)
+    else:
+        _constraint_cache.move_to_end(key)
+    return verdict
+
+
+def _find_constraint(
+    board_before: chess.Board,
+    move_played: chess.Move,
+    eval_initial: int,
+    eval_final: int,
+    player_is_white: bool,
+    engine
+) -> Optional[str]:
     player_eval_before = _to_player_eval(eval_initial, player_is_white)
     player_eval_after = _to_player_eval(eval_final, player_is_white)
     
+    # Generated once and shared by every helper below
     legal_moves = list(board_before.legal_moves)
     
     # --- 1. FORCED LOSS ---
     # Must be losing AND all alternatives also lose
     if player_eval_before <= -800:
-        if _all_moves_lose(board_before, player_is_white, engine):
+        if _all_moves_lose(board_before, legal_moves, player_is_white, engine):
             return "The position was already lost."
     
     # --- 2. ONLY MOVE ---
@@ -279,14 +322,14 @@ def analyze_constraints(
         return "This was the only move."
     
     # Only move that avoids immediate mate
-    moves_avoiding_mate = _get_moves_avoiding_immediate_mate(board_before)
+    moves_avoiding_mate = _get_moves_avoiding_immediate_mate(board_before, legal_moves)
     if len(moves_avoiding_mate) == 1 and move_played in moves_avoiding_mate:
         return "This was the only move."
     
     # Only viable move by eval (needs engine)
     if engine is not None and len(legal_moves) <= 6:
         viable_count = _get_viable_alternatives(
-            board_before, move_played, player_eval_after, player_is_white, engine
+            board_before, legal_moves, move_played, player_eval_after, player_is_white, engine
         )
         if viable_count == 1:
             return "This was the only move."
@@ -294,7 +337,7 @@ def analyze_constraints(
     # --- 3. IGNORED THREAT ---
     if player_eval_before >= -100 and player_eval_after <= -300:
         if engine is not None:
-            if _saving_move_exists(board_before, move_played, player_is_white, engine):
+            if _saving_move_exists(board_before, legal_moves, move_played, player_is_white, engine):
                 return "This move failed to stop the threat."
     
     return None
@@ -326,20 +369,20 @@ def assess_move(
     # Default explanation (fallback)
     explanation = "This move caused a significant evaluation drop."
 
-    # Tactical overrides (priority-based)
-    if board_before and board_after:
+    # Tactical overrides (priority-based). Only a costly move needs a
+    # tactical reason; for good moves the board scans are skipped entirely.
+    if board_before and board_after and grade <= MoveGrade.MISTAKE:
         player_color = chess.WHITE if player_is_white else chess.BLACK
 
-        for detector in (
-            lambda: _detect_missed_mate(eval_initial, eval_final),
-            lambda: _detect_allowed_mate(board_after, eval_final, player_is_white),
-            lambda: _detect_hung_piece(board_before, board_after, player_color),
-            lambda: _detect_material_loss(board_before, board_after, player_color),
-        ):
-            result = detector()
-            if result:
-                explanation = result
-                break
+        # First detector with a message wins; later ones are not evaluated
+        result = (
+            _detect_missed_mate(eval_initial, eval_final)
+            or _detect_allowed_mate(board_after, eval_final, player_is_white)
+            or _detect_hung_piece(board_before, board_after, player_color)
+            or _detect_material_loss(board_before, board_after, player_color)
+        )
+        if result:
+            explanation = result
 
     # Constraint analysis (highest priority, overrides all)
     if board_before is not None:
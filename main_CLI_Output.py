@@ -1,5 +1,6 @@
 # Game loop and CLI interface.
 
+import os
 import chess
 from engine import ChessEngine
 from instructor import assess_move, MoveGrade
@@ -12,7 +13,9 @@ from instructor import assess_move, MoveGrade
 STOCKFISH_PATH = r"D:\CODE\PROJECTS\Chess Stockfish\stockfish\stockfish-windows-x86-64-avx2.exe"  # macOS Homebrew default
 
 ENGINE_DEPTH = 15       # Analysis depth (15 is good balance of speed/quality)
+ENGINE_BEFORE_DEPTH = 12  # Pre-move search only finds the best move; grading uses ENGINE_DEPTH
 ENGINE_MOVE_TIME = 1.0  # Seconds for engine to think when playing
+ENGINE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".chess_analyzer_cache.sqlite")  # Analyses reused across runs
 
 
 # =============================================================================
@@ -39,6 +42,11 @@ GRADE_COLORS = {
     MoveGrade.BLUNDER: Colors.MAGENTA,
 }
 
+# Colored grade label, built once per grade
+GRADE_LABELS = {
+    grade: f"{color}{grade.name}{Colors.RESET}" for grade, color in GRADE_COLORS.items()
+}
+
 
 def display_board(board: chess.Board) -> None:
     """Print the board with coordinates."""
@@ -69,12 +77,10 @@ def display_assessment(board: chess.Board, assessment) -> None:
     else:
         best_move_san = None
     
-    color = GRADE_COLORS.get(assessment.grade, "")
-    
     print(f"\n{'─' * 55}")
     print(f"  Move played: {Colors.BOLD}{move_san}{Colors.RESET}")
     print(f"  Evaluation:  {assessment.eval_initial/100:+.2f}  →  {assessment.eval_final/100:+.2f}")
-    print(f"  Grade:       {color}{assessment.grade.name}{Colors.RESET}")
+    print(f"  Grade:       {GRADE_LABELS[assessment.grade]}")
     
     if not assessment.was_best_move and best_move_san is not None:
         print(f"  Best was:    {best_move_san}")
@@ -177,22 +183,26 @@ def play_game(engine: ChessEngine) -> None:
             # === PLAYER'S TURN ===
             
             # 1. Analyze BEFORE player moves (to get best move + baseline eval)
-            analysis_initial = engine.analyze(board)
+            analysis_initial = engine.analyze(board, depth=min(ENGINE_BEFORE_DEPTH, ENGINE_DEPTH))
             
             # 2. Get player's move
             player_move = get_player_move(board)
             
             # 3. Analyze position AFTER player's move
-            #    (Use a copy so we don't modify board yet)
-            board_copy = board.copy()
-            board_copy.push(player_move)
-            analysis_final = engine.analyze(board_copy)
+            #    (Use a copy so we don't modify board yet).
+            #    The best move's score is already known from step 1.
+            if player_move == analysis_initial.best_move:
+                eval_final = analysis_initial.cp_score_white
+            else:
+                board_copy = board.copy()
+                board_copy.push(player_move)
+                eval_final = engine.analyze(board_copy).cp_score_white
             
             # 4. Generate assessment (no board needed, pure move/eval logic)
             assessment = assess_move(
                 move_played=player_move,
                 eval_initial=analysis_initial.cp_score_white,
-                eval_final=analysis_final.cp_score_white,
+                eval_final=eval_final,
                 best_move=analysis_initial.best_move,
                 player_is_white=player_is_white
             )
@@ -229,7 +239,7 @@ def main():
     
     try:
         # 'with' ensures engine.stop() is called even if we crash
-        with ChessEngine(STOCKFISH_PATH, depth=ENGINE_DEPTH) as engine:
+        with ChessEngine(STOCKFISH_PATH, depth=ENGINE_DEPTH, cache_path=ENGINE_CACHE_PATH) as engine:
             play_game(engine)
             
     except FileNotFoundError:
@@ -0,0 +1,180 @@
+# Cache behaviour of ChessEngine, checked by counting searches.
+# Runs without Stockfish: the UCI process is replaced by an in-process fake.
+# python -m unittest test_engine
+
+import unittest
+from types import SimpleNamespace
+
+import chess
+import chess.engine
+
+from engine import AnalysisResult, ChessEngine
+
+
+class FakeUci:
+    # Stands in for chess.engine.SimpleEngine; counts every search it is asked for.
+    # Every line scores 10 cp less than the previous one; the best reply is the
+    # first legal move.
+
+    def __init__(self):
+        self.plays = 0
+        self.analyses = 0
+
+    def _info(self, board, move, depth, multipv=1):
+        pv = [move]
+        child = board.copy(stack=False)
+        child.push(move)
+        reply = next(iter(child.legal_moves), None)
+        if reply is not None:
+            pv.append(reply)
+        return {
+            "score": chess.engine.PovScore(chess.engine.Cp(50 - 10 * multipv), board.turn),
+            "depth": depth,
+            "nodes": depth * 1000,
+            "pv": pv,
+            "multipv": multipv,
+        }
+
+    def play(self, board, limit, info=None, root_moves=None):
+        self.plays += 1
+        moves = root_moves or list(board.legal_moves)
+        depth = limit.depth or 20
+        return SimpleNamespace(move=moves[0], info=self._info(board, moves[0], depth))
+
+    def analyse(self, board, limit, multipv=None, info=None):
+        self.analyses += 1
+        moves = list(board.legal_moves)[:multipv or 1]
+        return [self._info(board, move, limit.depth, i + 1) for i, move in enumerate(moves)]
+
+    @property
+    def searches(self):
+        return self.plays + self.analyses
+
+
+def make_engine(multipv=3):
+    engine = ChessEngine("stockfish", depth=15, multipv=multipv)
+    engine._engine = FakeUci()
+    return engine
+
+
+class CacheReuseTest(unittest.TestCase):
+
+    def test_engine_reply_reuses_after_analysis(self):
+        # The GUI's ENGINE_REUSE_ANALYSIS path, with MultiPV on
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        move = chess.Move.from_uci("e2e4")
+        engine.analyze_with_move(board, move, before_depth=12)
+        searches = engine._engine.searches
+
+        board.push(move)
+        reply = engine.get_move(board, time_limit=0.1, reuse_analysis=True)
+
+        self.assertIsNotNone(reply)
+        self.assertEqual(engine._engine.searches, searches)
+
+    def test_replayed_move_is_not_searched_again(self):
+        # Undo + the same move again: both positions come from the cache
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        move = chess.Move.from_uci("e2e4")
+        first = engine.analyze_with_move(board, move, before_depth=12)
+        searches = engine._engine.searches
+
+        second = engine.analyze_with_move(board, move, before_depth=12)
+
+        self.assertEqual(second, first)
+        self.assertEqual(engine._engine.searches, searches)
+
+    def test_reply_seed_answers_score_only_before_analysis(self):
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        board.push_uci("e2e4")
+        reply = engine.get_move(board, time_limit=0.1)
+        board.push(reply)
+        searches = engine._engine.searches
+
+        result = engine.analyze(board, depth=12, multipv=1)
+
+        self.assertIsNotNone(result.best_move)
+        self.assertEqual(engine._engine.searches, searches)
+
+        # Asking for the full MultiPV lines still searches
+        result = engine.analyze(board, depth=12)
+        self.assertEqual(len(result.top_moves), 3)
+        self.assertEqual(engine._engine.searches, searches + 1)
+
+
+class CachePutTest(unittest.TestCase):
+
+    def result(self, depth, multipv):
+        return AnalysisResult(10, None, False, None, depth=depth, multipv=multipv)
+
+    def test_shallower_result_with_more_lines_keeps_deeper_entry(self):
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        engine._cache_put(board, self.result(20, 1))
+        engine._cache_put(board, self.result(12, 3))
+
+        self.assertEqual(engine._cache_get(board, depth=20, multipv=1).depth, 20)
+
+    def test_equal_depth_prefers_more_lines(self):
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        engine._cache_put(board, self.result(15, 3))
+        engine._cache_put(board, self.result(15, 1))
+
+        self.assertEqual(engine._cache_get(board, depth=15).multipv, 3)
+
+    def test_deeper_result_replaces_entry(self):
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        engine._cache_put(board, self.result(12, 3))
+        engine._cache_put(board, self.result(20, 1))
+
+        self.assertEqual(engine._cache_get(board, depth=20, multipv=1).depth, 20)
+
+
+class FakeRunningAnalysis:
+    # Stands in for chess.engine.SimpleAnalysisResult mid-search
+
+    def __init__(self, lines):
+        self.multipv = lines
+        self.info = lines[0]
+
+    def stop(self):
+        pass
+
+    def wait(self):
+        pass
+
+
+class PonderSnapshotTest(unittest.TestCase):
+
+    def ponder(self, engine, board, depths):
+        fake = FakeUci()
+        moves = list(board.legal_moves)
+        lines = [fake._info(board, moves[i], depth, i + 1) for i, depth in enumerate(depths)]
+        engine._current_board = board.copy(stack=False)
+        engine._current_analysis = FakeRunningAnalysis(lines)
+        engine.stop_analysis()
+        return engine._cache_get(board, depth=1, multipv=1)
+
+    def test_snapshot_claims_shallowest_line_depth(self):
+        engine = make_engine(multipv=3)
+        snapshot = self.ponder(engine, chess.Board(), [20, 19, 19])
+
+        self.assertEqual(snapshot.depth, 19)
+        self.assertEqual(snapshot.multipv, 3)
+
+    def test_snapshot_does_not_claim_unreported_lines(self):
+        engine = make_engine(multipv=3)
+        board = chess.Board()
+        snapshot = self.ponder(engine, board, [20, 20])
+
+        self.assertEqual(snapshot.multipv, 2)
+        self.assertIsNone(engine._cache_get(board, depth=12, multipv=3))
+
+
+if __name__ == "__main__":
+    unittest.main()